@@ -2,7 +2,7 @@
 
 """cxsi.py: CxSAST scan usage insight.
 
-    Requires Python 3.6+
+    Requires Python 3.7+
 """
 
 __author__ = 'Randy Geyer'
@@ -18,35 +18,48 @@ import os
 from os import path
 from collections import OrderedDict
 from datetime import datetime, timedelta, date
-import dateutil
+import functools
 import json
 import logging
 import pprint
 from timeit import default_timer as timer
-from typing import (Dict, List, Any)
+from typing import (Dict, List, Any, NamedTuple)
 import sys
 
 import click  # command line parser
 import colorama
 import pandas as pd  # scan_data_file analysis
 import xlsxwriter as excel
+from xlsxwriter.utility import xl_col_to_name
+
+try:
+    import ijson  # optional, streaming json parsing
+except ImportError:
+    ijson = None
+
+try:
+    import orjson  # optional, 3-5x faster json parsing
+except ImportError:
+    orjson = None
+
+# parse failures to report cleanly, whichever parser handled the file
+JSON_ERRORS = (json.JSONDecodeError,) if ijson is None else (json.JSONDecodeError, ijson.JSONError)
 
 # check min python runtime
-MIN_PYTHON = (3, 6)
+MIN_PYTHON = (3, 7)
 if sys.version_info < MIN_PYTHON:
     sys.exit("Python %s.%s or later is required.\n" % MIN_PYTHON)
 
 
 # Helper classes
-class Args:
+class Args(NamedTuple):
     """Script argument scan_data_file holder"""
 
-    def __init__(self, customer: str, scan_data_file: str, excel_file: str, force: bool, debug: bool):
-        self.customer = customer
-        self.scan_data_file = scan_data_file
-        self.excel_file = excel_file
-        self.force = force
-        self.debug = debug
+    customer: str
+    scan_data_file: str
+    excel_file: str
+    force: bool
+    debug: bool
 
     def print(self):
         click.echo("{} v{}".format(__banner__, __version__))
@@ -71,7 +84,56 @@ _workbooks_props: Dict[str, OrderedDict]
 _worksheets: Dict[str, excel.worksheet.Worksheet] = {}
 
 # Constants
-SCANS_TABLE_NAME = 'AllScans'
+TABLE_TOP_ROWS = 2
+ODATA_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+DATE_COLUMNS = ('ScanRequestedOn', 'QueuedOn', 'EngineStartedOn', 'EngineFinishedOn', 'ScanCompletedOn')
+
+# (header, column index, json scan key) for the static scan columns;
+# ProjectId is not in the OData feed, columns 17-25 are derived stats
+# computed by compute_scan_stats, and language columns are appended
+# from init_lang_columns().
+SCAN_FIELDS = (
+    ('ScanId', 0, 'Id'),
+    ('ProjectName', 1, 'ProjectName'),
+    ('ProjectId', 2, None),
+    ('TeamId', 3, 'OwningTeamId'),
+    ('Team', 4, 'TeamName'),
+    ('EngineId', 5, 'EngineServerId'),
+    ('Origin', 6, 'Origin'),
+    ('Preset', 7, 'PresetName'),
+    ('Incr', 8, 'IsIncremental'),
+    ('LOC', 9, 'LOC'),
+    ('FailedLOC', 10, 'FailedLOC'),
+    ('FileCount', 11, 'FileCount'),
+    ('ScanRequestedOn', 12, 'ScanRequestedOn'),
+    ('QueuedOn', 13, 'QueuedOn'),
+    ('EngineStartedOn', 14, 'EngineStartedOn'),
+    ('EngineFinishedOn', 15, 'EngineFinishedOn'),
+    ('ScanCompletedOn', 16, 'ScanCompletedOn'),
+    ('ScanDuration', 17, None),
+    ('SourceTime', 18, None),
+    ('QueuedTime', 19, None),
+    ('EngineTime', 20, None),
+    ('ScanHours', 21, None),
+    ('Weekday', 22, None),
+    ('FullSpeed', 23, None),
+    ('IncrSpeed', 24, None),
+    ('Results', 25, None),
+    ('High', 26, 'High'),
+    ('Med', 27, 'Medium'),
+    ('Low', 28, 'Low'),
+    ('Info', 29, 'Info'),
+    ('Version', 30, 'ProductVersion'),
+    ('Locked', 31, 'IsLocked'),
+    ('Public', 32, 'IsPublic')
+)
+BOOL_FIELDS = frozenset(['IsIncremental', 'IsLocked', 'IsPublic'])
+# json keys expected from the OData feed; building the raw DataFrame
+# from this list guarantees every column exists even when the scan
+# list is empty (e.g. a filter window matching no scans)
+RAW_SCAN_COLUMNS = [scan_key for header, col, scan_key in SCAN_FIELDS if scan_key] + ['ScannedLanguages']
+NUM_SCAN_COLS = 52
+SCAN_HEADER_COLS = {header: col for header, col, scan_key in SCAN_FIELDS}
 
 
 # Print iterations progress
@@ -88,7 +150,7 @@ def print_progress_bar(iteration, total, prefix='', suffix='', decimals=1, lengt
         fill        - Optional  : bar fill character (Str)
         printEnd    - Optional  : end character (e.g. "\r", "\r\n") (Str)
     """
-    percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
+    percent = "{0:.{1}f}".format(100 * (iteration / float(total)), decimals)
     filledLength = int(length * iteration // total)
     bar = fill * filledLength + '-' * (length - filledLength)
     print('\r%s |%s| %s%% %s' % (prefix, bar, percent, suffix), end=print_end)
@@ -101,11 +163,11 @@ def exit_script(code: int = 0):
     """Cleanly exits script"""
     try:
         if _scans_wb is not None:
-            _log.debug('Closing workbook: {}'.format(_args.excel_file))
+            _log.debug('Closing workbook: %s', _args.excel_file)
             _scans_wb.close()
     except NameError:
         pass
-    _log.debug("Exiting script with exit code {}".format(code))
+    _log.debug("Exiting script with exit code %d", code)
     sys.exit(code)
 
 
@@ -146,8 +208,8 @@ def init_logging():
 
     global _log
     _log = logging.getLogger('cxsi')
-    _log.info('{} v{}'.format(__banner__, __version__))
-    _log.info('{}\n'.format(_args))
+    _log.info('%s v%s', __banner__, __version__)
+    _log.info('%s\n', _args)
 
 
 def init_wb_formats():
@@ -195,37 +257,36 @@ def init_wb_formats():
     return formats
 
 
-def init_lang_columns():
-    """Initializes the language columns"""
-    DEFAULT_HIDE = 0
+def init_lang_columns() -> Dict[str, int]:
+    """Initializes the language name to worksheet column mapping"""
 
     # Language column starts at 33
-    languages = OrderedDict([
-        ('Apex', {'col': 33, 'hidden': DEFAULT_HIDE}),
-        ('ASP', {'col': 34, 'hidden': DEFAULT_HIDE}),
-        ('Cobol', {'col': 35, 'hidden': DEFAULT_HIDE}),
-        ('CPP', {'col': 36, 'hidden': DEFAULT_HIDE}),
-        ('CSharp', {'col': 37, 'hidden': DEFAULT_HIDE}),
-        ('Groovy', {'col': 38, 'hidden': DEFAULT_HIDE}),
-        ('Go', {'col': 39, 'hidden': DEFAULT_HIDE}),
-        ('Java', {'col': 40, 'hidden': DEFAULT_HIDE}),
-        ('JavaScript', {'col': 41, 'hidden': DEFAULT_HIDE}),
-        ('Kotlin', {'col': 42, 'hidden': DEFAULT_HIDE}),
-        ('Objc', {'col': 43, 'hidden': DEFAULT_HIDE}),
-        ('PHP', {'col': 44, 'hidden': DEFAULT_HIDE}),
-        ('Perl', {'col': 45, 'hidden': DEFAULT_HIDE}),
-        ('Python', {'col': 46, 'hidden': DEFAULT_HIDE}),
-        ('Ruby', {'col': 47, 'hidden': DEFAULT_HIDE}),
-        ('Scala', {'col': 48, 'hidden': DEFAULT_HIDE}),
-        ('Typescript', {'col': 49, 'hidden': DEFAULT_HIDE}),
-        ('VbNet', {'col': 50, 'hidden': DEFAULT_HIDE}),
-        ('VB6', {'col': 51, 'hidden': DEFAULT_HIDE}),
+    languages = {
+        'Apex': 33,
+        'ASP': 34,
+        'Cobol': 35,
+        'CPP': 36,
+        'CSharp': 37,
+        'Groovy': 38,
+        'Go': 39,
+        'Java': 40,
+        'JavaScript': 41,
+        'Kotlin': 42,
+        'Objc': 43,
+        'PHP': 44,
+        'Perl': 45,
+        'Python': 46,
+        'Ruby': 47,
+        'Scala': 48,
+        'Typescript': 49,
+        'VbNet': 50,
+        'VB6': 51,
         # don't track these
-        ('Common', {'col': -1, 'hidden': DEFAULT_HIDE}),
-        ('PLSQL', {'col': -1, 'hidden': DEFAULT_HIDE}),
-        ('VbScript', {'col': -1, 'hidden': DEFAULT_HIDE}),
-        ('Unknown', {'col': -1, 'hidden': DEFAULT_HIDE})
-    ])
+        'Common': -1,
+        'PLSQL': -1,
+        'VbScript': -1,
+        'Unknown': -1
+    }
     return languages
 
 
@@ -247,23 +308,36 @@ def load_json(file: str) -> OrderedDict:
     """
 
     file_path: str = path.abspath(file)
-    _log.info('Loading scan data from json file: {}'.format(file))
+    _log.info('Loading scan data from json file: %s', file)
 
-    if path.exists(file) and path.getsize(file):
-        _log.debug("Scan json data file found: {}".format(file_path))
+    # single stat covers both the existence and the empty-file check
+    try:
+        file_size = os.stat(file).st_size
+    except OSError:
+        file_size = 0
+    if file_size:
+        _log.debug("Scan json data file found: %s", file_path)
     else:
-        _log.warning("Scan json data file not found or is empty: {}...exiting".format(file_path))
+        _log.warning("Scan json data file not found or is empty: %s...exiting", file_path)
         exit_script(2)
 
     with open(file) as json_file:
         try:
-            scan_data = json.load(json_file)
+            if ijson is not None:
+                # stream scan objects off the file instead of buffering
+                # the raw text and the whole document at once; only the
+                # scan list itself is materialized
+                scan_data = {'value': list(ijson.items(json_file, 'value.item', use_float=True))}
+            elif orjson is not None:
+                scan_data = orjson.loads(json_file.read())
+            else:
+                scan_data = json.load(json_file)
             # scan_data = json.load(json_file, object_pairs_hook=OrderedDict)
-            _log.info("Loaded json, scan count: {}".format(len(scan_data['value'])))
+            _log.info("Loaded json, scan count: %d", len(scan_data['value']))
             if _args.debug:
-                _log.debug('First 10 scans...:\n{}'.format(pprint.pformat(scan_data['value'][:10], sort_dicts=False)))
-        except json.JSONDecodeError as err:
-            _log.critical("Failed to load json: {}".format(err.msg))
+                _log.debug('First 10 scans...:\n%s', pprint.pformat(scan_data['value'][:10], sort_dicts=False))
+        except JSON_ERRORS as err:
+            _log.critical("Failed to load json: %s", err)
             _log.exception(err)
             exit_script(3)
 
@@ -280,11 +354,10 @@ def init_scans_ws_options(lang_columns):
     DEFAULT_LANG_WIDTH = 8
 
     options = {
-        'name': SCANS_TABLE_NAME,
         'columns': [
             {'header': 'ScanId', 'format': _wb_formats['integer'], 'width': DEFAULT_COL_WIDTH},
             {'header': 'ProjectName', 'format': _wb_formats['general'], 'width': 30},
-            {'header': 'ProjectId', 'format': _wb_formats['integer'], 'width': DEFAULT_COL_WIDTH},
+            {'header': 'ProjectId', 'format': _wb_formats['integer'], 'width': DEFAULT_COL_WIDTH, 'hidden': 1},
             {'header': 'TeamId', 'format': _wb_formats['general'], 'width': 36},
             {'header': 'Team', 'format': _wb_formats['general'], 'width': 15},
             {'header': 'EngineId', 'format': _wb_formats['integer'], 'width': DEFAULT_COL_WIDTH},
@@ -299,33 +372,15 @@ def init_scans_ws_options(lang_columns):
             {'header': 'EngineStartedOn', 'format': _wb_formats['datetime'], 'width': DEFAULT_DATE_WIDTH},
             {'header': 'EngineFinishedOn', 'format': _wb_formats['datetime'], 'width': DEFAULT_DATE_WIDTH},
             {'header': 'ScanCompletedOn', 'format': _wb_formats['datetime'], 'width': DEFAULT_DATE_WIDTH},
-            {'header': 'ScanDuration', 'format': _wb_formats['duration'], 'width': DEFAULT_DURATION_WIDTH,
-             'formula': '=IF([@ScanCompletedOn]>0,[@ScanCompletedOn]-[@ScanRequestedOn],0)'
-             },
-            {'header': 'SourceTime', 'format': _wb_formats['duration'], 'width': DEFAULT_DURATION_WIDTH,
-             'formula': '=[@QueuedOn]-[@ScanRequestedOn]'
-             },
-            {'header': 'QueuedTime', 'format': _wb_formats['duration'], 'width': DEFAULT_DURATION_WIDTH,
-             'formula': '=IF([@EngineStartedOn]>0,[@EngineStartedOn]-[@QueuedOn],0)'
-             },
-            {'header': 'EngineTime', 'format': _wb_formats['duration'], 'width': DEFAULT_DURATION_WIDTH,
-             'formula': '=IF([@EngineFinishedOn]>0,[@EngineFinishedOn]-[@QueuedOn],0)'
-             },
-            {'header': 'ScanHours', 'format': _wb_formats['decimal 2'], 'width': DEFAULT_COL_WIDTH,
-             'formula': '=[@ScanDuration]*24'
-             },
-            {'header': 'Weekday', 'format': _wb_formats['integer'], 'width': DEFAULT_COL_WIDTH,
-             'formula': '=WEEKDAY([@ScanRequestedOn])'
-             },
-            {'header': 'FullSpeed', 'format': _wb_formats['integer'], 'width': DEFAULT_RATE_WIDTH,
-             'formula': '=IF(AND([@ScanDuration]>0,[@Incr]=0),[@LOC]/([@ScanDuration]*24),0)'
-             },
-            {'header': 'IncrSpeed', 'format': _wb_formats['integer'], 'width': DEFAULT_RATE_WIDTH,
-             'formula': '=IF(AND([@ScanDuration]>0,[@Incr]=1),[@LOC]/([@ScanDuration]*24),0)'
-             },
-            {'header': 'Results', 'format': _wb_formats['integer'], 'width': DEFAULT_RESULT_WIDTH,
-             'formula': '=SUM([@High],[@Med],[@Low],[@Info])'
-             },
+            {'header': 'ScanDuration', 'format': _wb_formats['duration'], 'width': DEFAULT_DURATION_WIDTH},
+            {'header': 'SourceTime', 'format': _wb_formats['duration'], 'width': DEFAULT_DURATION_WIDTH},
+            {'header': 'QueuedTime', 'format': _wb_formats['duration'], 'width': DEFAULT_DURATION_WIDTH},
+            {'header': 'EngineTime', 'format': _wb_formats['duration'], 'width': DEFAULT_DURATION_WIDTH},
+            {'header': 'ScanHours', 'format': _wb_formats['decimal 2'], 'width': DEFAULT_COL_WIDTH},
+            {'header': 'Weekday', 'format': _wb_formats['integer'], 'width': DEFAULT_COL_WIDTH},
+            {'header': 'FullSpeed', 'format': _wb_formats['integer'], 'width': DEFAULT_RATE_WIDTH},
+            {'header': 'IncrSpeed', 'format': _wb_formats['integer'], 'width': DEFAULT_RATE_WIDTH},
+            {'header': 'Results', 'format': _wb_formats['integer'], 'width': DEFAULT_RESULT_WIDTH},
             {'header': 'High', 'format': _wb_formats['integer'], 'width': DEFAULT_RESULT_WIDTH},
             {'header': 'Med', 'format': _wb_formats['integer'], 'width': DEFAULT_RESULT_WIDTH},
             {'header': 'Low', 'format': _wb_formats['integer'], 'width': DEFAULT_RESULT_WIDTH},
@@ -335,72 +390,144 @@ def init_scans_ws_options(lang_columns):
             {'header': 'Public', 'format': _wb_formats['integer'], 'width': 8}
         ]
     }
-    for lang in lang_columns:
-        lang_col = lang_columns[lang]
-        if lang_col['col'] > -1:
+    for lang, col in lang_columns.items():
+        if col > -1:
             lang_header = {'header': lang, 'format': _wb_formats['integer'], 'width': DEFAULT_LANG_WIDTH}
             options['columns'].append(lang_header)
 
     return options
 
 
+@functools.lru_cache(maxsize=None)
 def convert_datetime(date_str: str) -> datetime:
-    return dateutil.parser.parse(date_str)
-
-
-def convert_json_scan(scan: OrderedDict, lang_columns):
-    scan_row = OrderedDict([
-        ('ScanId', {'value': scan['Id'], 'col': 0}),
-        ('ProjectName', {'value': scan['ProjectName'], 'col': 1}),
-        ('ProjectId', {'value': None, 'col': 2}),
-        ('TeamId', {'value': scan['OwningTeamId'], 'col': 3}),
-        ('Team', {'value': scan['TeamName'], 'col': 4}),
-        ('EngineId', {'value': scan['EngineServerId'], 'col': 5}),
-        ('Origin', {'value': scan['Origin'], 'col': 6}),
-        ('Preset', {'value': scan['PresetName'], 'col': 7}),
-        ('Incr', {'value': 1 if scan['IsIncremental'] else 0, 'col': 8}),
-        ('LOC', {'value': scan['LOC'], 'col': 9}),
-        ('FailedLOC', {'value': scan['FailedLOC'], 'col': 10}),
-        ('FileCount', {'value': scan['FileCount'], 'col': 11}),
-        ('ScanRequestedOn', {'value': convert_datetime(scan['ScanRequestedOn']), 'col': 12}),
-        ('QueuedOn', {'value': convert_datetime(scan['QueuedOn']), 'col': 13}),
-        ('EngineStartedOn', {'value': convert_datetime(scan['EngineStartedOn']), 'col': 14}),
-        ('EngineFinishedOn', {'value': convert_datetime(scan['EngineFinishedOn']), 'col': 15}),
-        ('ScanCompletedOn', {'value': convert_datetime(scan['ScanCompletedOn']), 'col': 16}),
-        ('High', {'value': scan['High'], 'col': 26}),
-        ('Med', {'value': scan['Medium'], 'col': 27}),
-        ('Low', {'value': scan['Low'], 'col': 28}),
-        ('Info', {'value': scan['Info'], 'col': 29}),
-        ('Version', {'value': scan['ProductVersion'], 'col': 30}),
-        ('Locked', {'value': 1 if scan['IsLocked'] else 0, 'col': 31}),
-        ('Public', {'value': 1 if scan['IsPublic'] else 0, 'col': 32})
-    ])
-    # add language columns
-    for lang in scan['ScannedLanguages']:
-        lang_name = lang['LanguageName']
-        lang_col = lang_columns[lang_name]
-        scan_row[lang_name] = {'value': 1, 'col': lang_col['col']}
+    """Parses a CxSAST OData timestamp, e.g. '2019-05-01T00:00:00.123Z'.
+
+    The OData feed always emits ISO-8601 UTC timestamps, so the fast
+    fixed-format parse is tried first; dateutil is only used as a
+    fallback for anything unexpected.  Batched scans share request and
+    queue timestamps, so results are memoized to skip repeat parses.
+    """
+    try:
+        if date_str.endswith('Z'):
+            date_str = date_str[:-1]
+        return datetime.fromisoformat(date_str)
+    except ValueError:
+        from dateutil import parser as dateutil_parser
+        return dateutil_parser.parse(date_str)
+
+
+def convert_scan_dates(df: pd.DataFrame):
+    """Parses the timestamp columns of the scan DataFrame in place.
+
+    pandas parses each column in C with a fixed format and memoizes
+    repeated date strings (cache=True), which is an order of magnitude
+    faster than per-scan parsing.  Parsed values are naive UTC datetimes.
+
+    :param df: the raw scan DataFrame, modified in place
+    """
+    for date_col in DATE_COLUMNS:
+        try:
+            df[date_col] = pd.to_datetime(df[date_col], format=ODATA_DATE_FORMAT,
+                                          utc=True, cache=True).dt.tz_localize(None)
+        except ValueError:
+            # unexpected format somewhere in the column; parse values
+            # individually, letting nulls pass through as NaT
+            df[date_col] = pd.to_datetime(df[date_col].map(convert_datetime, na_action='ignore'))
+
 
-    return scan_row
+def compute_scan_stats(df: pd.DataFrame):
+    """Fills the derived stat columns with precomputed values.
+
+    These columns used to be per-cell Excel formulas; computing them
+    here keeps the workbook smaller and avoids a recalculation of N
+    formulas every time it is opened.  Durations are Excel day
+    fractions, so the duration number formats still apply.
+
+    :param df: the worksheet-shaped scan DataFrame, modified in place
+    """
+    DAY_SECONDS = 86400.0
+    requested = df['ScanRequestedOn']
+    queued = df['QueuedOn']
+    duration = (df['ScanCompletedOn'] - requested).dt.total_seconds() / DAY_SECONDS
+    df['ScanDuration'] = duration.fillna(0)
+    df['SourceTime'] = (queued - requested).dt.total_seconds() / DAY_SECONDS
+    df['QueuedTime'] = ((df['EngineStartedOn'] - queued).dt.total_seconds() / DAY_SECONDS).fillna(0)
+    df['EngineTime'] = ((df['EngineFinishedOn'] - queued).dt.total_seconds() / DAY_SECONDS).fillna(0)
+    df['ScanHours'] = df['ScanDuration'] * 24
+    # Excel WEEKDAY: Sunday=1 .. Saturday=7; pandas weekday: Monday=0
+    df['Weekday'] = (requested.dt.weekday + 1) % 7 + 1
+    hours = df['ScanDuration'] * 24
+    speed = (df['LOC'] / hours.where(hours > 0)).fillna(0)
+    df['FullSpeed'] = speed.where(df['Incr'] == 0, 0)
+    df['IncrSpeed'] = speed.where(df['Incr'] == 1, 0)
+    df['Results'] = df[['High', 'Med', 'Low', 'Info']].sum(axis=1)
+
+
+def scan_col_range(header: str, num_scans: int) -> str:
+    """Returns the absolute Scans-sheet range holding a scan table column,
+    for use in Summary worksheet formulas."""
+    letter = xl_col_to_name(SCAN_HEADER_COLS[header])
+    return 'Scans!${0}${1}:${0}${2}'.format(letter, TABLE_TOP_ROWS + 1, TABLE_TOP_ROWS + num_scans)
+
+
+def convert_scans_df(scans: List[Dict]) -> pd.DataFrame:
+    """Converts the json scan list into a DataFrame shaped like the
+    Scans worksheet: one column per worksheet column, in column order.
+
+    :param scans: the scan dicts loaded from json
+    :return: the worksheet-shaped scan DataFrame
+    """
+    raw = pd.DataFrame(scans, columns=RAW_SCAN_COLUMNS)
+    convert_scan_dates(raw)
+
+    df = pd.DataFrame(index=raw.index)
+    for header, col, scan_key in SCAN_FIELDS:
+        if scan_key is None:
+            df[header] = None
+        elif scan_key in BOOL_FIELDS:
+            df[header] = raw[scan_key].astype(int)
+        else:
+            df[header] = raw[scan_key]
+
+    # one-hot language columns (untracked languages have col -1), fanned
+    # out in C via explode + crosstab instead of a per-scan Python loop;
+    # absent languages stay NaN so their cells are written blank
+    langs = raw['ScannedLanguages'].explode().str['LanguageName']
+    one_hot = pd.crosstab(langs.index, langs).clip(upper=1).reindex(index=raw.index)
+    for lang, col in init_lang_columns().items():
+        if col > -1:
+            if lang in one_hot.columns:
+                df[lang] = one_hot[lang].where(one_hot[lang] == 1)
+            else:
+                df[lang] = None
+
+    compute_scan_stats(df)
+    return df
 
 
 def create_scans_wb(excel_file, force):
     excel_path: str = path.abspath(excel_file)
-    if path.exists(excel_file):
-        if force:
-            _log.warning('Excel file exists, overwriting: {}'.format(excel_path))
-            try:
-                os.remove(excel_file)
-            except OSError as err:
-                _log.critical('Unable to overwrite excel file: {}'.format(err.strerror))
-                exit_script(4)
+    if force:
+        # remove directly rather than stat-then-remove
+        try:
+            os.remove(excel_file)
+        except FileNotFoundError:
+            _log.info('Creating Excel file: %s', excel_file)
+        except OSError as err:
+            _log.critical('Unable to overwrite excel file: %s', err.strerror)
+            exit_script(4)
         else:
-            _log.error('Excel file exists: {}\nUse -force flag to overwrite'.format(excel_path))
-            exit_script(1)
+            _log.warning('Excel file exists, overwriting: %s', excel_path)
+    elif path.exists(excel_file):
+        _log.error('Excel file exists: %s\nUse -force flag to overwrite', excel_path)
+        exit_script(1)
     else:
-        _log.info('Creating Excel file: {}'.format(excel_file))
+        _log.info('Creating Excel file: %s', excel_file)
 
-    wb_options = {'remove_timezone': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss'}
+    # constant_memory streams rows to disk as they are written, keeping
+    # memory flat regardless of scan count; requires strict row order
+    wb_options = {'remove_timezone': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+                  'constant_memory': True}
     scans_wb = excel.Workbook(excel_file, wb_options)
     scans_wb.set_properties({
         'title': '{} CxSAST Usage'.format(_args.customer),
@@ -442,25 +569,28 @@ def init_workbook(excel_file: str, force: bool):
         _wb_formats[format_] = _scans_wb.add_format(formats[format_])
 
 
-def write_scans_ws(scans: List[OrderedDict]):
+def write_scans_ws(scans_df: pd.DataFrame):
     """Populates the Scans worksheet"""
 
-    TABLE_TOP_ROWS = 2
-
-    num_scans = len(scans)
-    _log.info('Writing scans into worksheet: count={}'.format(num_scans))
+    num_scans = len(scans_df)
+    _log.info('Writing scans into worksheet: count=%d', num_scans)
 
     start = timer()
 
     lang_columns = init_lang_columns()
     options = init_scans_ws_options(lang_columns)
-    table_range = 'A{}:AX{}'.format(TABLE_TOP_ROWS, TABLE_TOP_ROWS + num_scans)
+    table_range = 'A{}:{}{}'.format(TABLE_TOP_ROWS, xl_col_to_name(NUM_SCAN_COLS - 1),
+                                    TABLE_TOP_ROWS + num_scans)
 
     ws = _worksheets['Scans']
 
-    # format header rows
-    ws.set_row(0, 14.4, _wb_formats['header_color'])
+    # resolve shared format handles once (formats are created a single
+    # time in init_workbook; never call add_format in a write loop)
+    header_color = _wb_formats['header_color']
     merge_format = _wb_formats['header_merge']
+
+    # format header rows
+    ws.set_row(0, 14.4, header_color)
     ws.merge_range('M1:Q1', 'Date Timestamps', merge_format)
     ws.merge_range('R1:V1', 'Durations', merge_format)
     ws.merge_range('W1:Y1', 'Rates per hour', merge_format)
@@ -468,46 +598,52 @@ def write_scans_ws(scans: List[OrderedDict]):
     ws.merge_range('AH1:AX1', 'Languages', merge_format)
     ws.freeze_panes(2, 2)
 
-    # set column widths
-    col = 0
-    for column in options['columns']:
-        col_options = {}
-        if column['header'] == 'ProjectId':
-            col_options = {'hidden': 1}
-        ws.set_column(col, col, column['width'], None, col_options)
-        col += 1
-
-    # set language columns
-    DEFAULT_LANG_COL_WIDTH = 8
-    for lang in lang_columns:
-        lang_col = lang_columns[lang]
-        col = lang_col['col']
-        if col > -1:
-            col_options = {'hidden': lang_col['hidden']}
-            ws.set_column(col, col, DEFAULT_LANG_COL_WIDTH, None, col_options)
-
-    scan_table = ws.add_table(table_range, options)
-
-    # populate data rows
+    # set column widths, formats and visibility in one pass over the
+    # column defs (language columns included); data cells pick up the
+    # column format since there is no table to carry per-column formats
+    for col, column in enumerate(options['columns']):
+        col_options = {'hidden': 1} if column.get('hidden') else {}
+        ws.set_column(col, col, column['width'], column['format'], col_options)
+
+    # add_table is not supported in constant_memory mode, so write the
+    # header row and autofilter manually
+    ws.write_row(TABLE_TOP_ROWS - 1, 0, [column['header'] for column in options['columns']],
+                 header_color)
+    ws.autofilter(table_range)
+
+    # populate data rows strictly top-to-bottom, one write_row per scan,
+    # so constant_memory can flush each row as it is written
+    # throttle the progress bar to ~200 refreshes; a terminal write per
+    # scan dominates wall time on large workbooks
+    progress_step = max(1, num_scans // 200)
+    # NaN/NaT become None so xlsxwriter leaves those cells blank
+    data = scans_df.astype(object).where(scans_df.notna(), None)
     i = 0
-    for scan_item in scans:
-        print_progress_bar(i + 1, num_scans)
-        scan_row = convert_json_scan(scan_item, lang_columns)
-        for scan_col in scan_row:
-            cell = scan_row[scan_col]
-            ws.write(i + TABLE_TOP_ROWS, cell['col'], cell['value'])
+    for scan_values in data.itertuples(index=False, name=None):
+        if i % progress_step == 0 or i == num_scans - 1:
+            print_progress_bar(i + 1, num_scans)
+        ws.write_row(TABLE_TOP_ROWS + i, 0, scan_values)
         i += 1
 
     end = timer()
-    _log.info('Done; elapsedTime={:0.0f}ms'.format((end - start) * 1000))
+    _log.info('Done; elapsedTime=%.0fms', (end - start) * 1000)
 
 
-def write_summary_ws(scans: List[OrderedDict]):
+def write_summary_ws(scans_df: pd.DataFrame):
     _log.info('Writing summary data...')
 
     ws = _worksheets['Summary']
 
-    TABLE = SCANS_TABLE_NAME
+    # scan table column ranges referenced by the summary formulas
+    num_scans = len(scans_df)
+    scan_requested = scan_col_range('ScanRequestedOn', num_scans)
+    scan_completed = scan_col_range('ScanCompletedOn', num_scans)
+    scan_id = scan_col_range('ScanId', num_scans)
+    incr = scan_col_range('Incr', num_scans)
+    weekday = scan_col_range('Weekday', num_scans)
+    full_speed = scan_col_range('FullSpeed', num_scans)
+    incr_speed = scan_col_range('IncrSpeed', num_scans)
+
     bold = _wb_formats['bold']
     header = _wb_formats['summary header']
     integer = _wb_formats['integer']
@@ -528,53 +664,46 @@ def write_summary_ws(scans: List[OrderedDict]):
     row = 1
     col = 1
     write_headers(ws, row, col, ['Scans', 'Stats'], header)
-    write_summary_info(ws, row + 1, col, 'Start Date', '=MIN({}[ScanRequestedOn])'.format(TABLE), date)
-    write_summary_info(ws, row + 2, col, 'End Date', '=MAX({}[ScanRequestedOn])'.format(TABLE), date)
+    write_summary_info(ws, row + 1, col, 'Start Date', '=MIN({})'.format(scan_requested), date)
+    write_summary_info(ws, row + 2, col, 'End Date', '=MAX({})'.format(scan_requested), date)
     write_summary_info(ws, row + 3, col, 'Days',
-                       '=MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn])'.format(TABLE))
+                       '=MAX({0})-MIN({0})'.format(scan_requested))
     write_summary_info(ws, row + 4, col, 'Weeks',
-                       '=ROUNDUP((MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn]))/7,0)'.format(TABLE))
-    write_summary_info(ws, row + 5, col, 'Scans', '=COUNT({}[ScanId])'.format(TABLE))
-    write_summary_info(ws, row + 6, col, 'Completed Scans', '=COUNT({}[ScanCompletedOn])'.format(TABLE))
+                       '=ROUNDUP((MAX({0})-MIN({0}))/7,0)'.format(scan_requested))
+    write_summary_info(ws, row + 5, col, 'Scans', '=COUNT({})'.format(scan_id))
+    write_summary_info(ws, row + 6, col, 'Completed Scans', '=COUNT({})'.format(scan_completed))
     write_summary_info(ws, row + 7, col, 'Scans Inflight',
-                       '=COUNT({0}[ScanId])-COUNT({0}[ScanCompletedOn])'.format(TABLE))
+                       '=COUNT({0})-COUNT({1})'.format(scan_id, scan_completed))
     write_summary_info(ws, row + 8, col, 'Full Scans',
-                       '=COUNTIF({}[Incr],"=0")'.format(TABLE))
+                       '=COUNTIF({},"=0")'.format(incr))
     write_summary_info(ws, row + 9, col, 'Incr Scans',
-                       '=COUNTIF({}[Incr],"=1")'.format(TABLE))
-    ws.write(row+9, col+2, '=COUNTIF({0}[Incr],"=1")/COUNT({0}[ScanId])'.format(TABLE), percent)
+                       '=COUNTIF({},"=1")'.format(incr))
+    ws.write(row+9, col+2, '=COUNTIF({0},"=1")/COUNT({1})'.format(incr, scan_id), percent)
     write_summary_info(ws, row + 10, col, 'Avg Full Scan Rate',
-                       '=AVERAGEIF({}[FullSpeed],"<>0")'.format(TABLE))
+                       '=AVERAGEIF({},"<>0")'.format(full_speed))
     ws.write(row+10, col+2, 'LOC / Hr')
     write_summary_info(ws, row + 11, col, 'Avg Incr Scan Rate',
-                       '=AVERAGEIFS({0}[IncrSpeed],{0}[Incr],"=1 ")'.format(TABLE))
+                       '=AVERAGEIFS({0},{1},"=1 ")'.format(incr_speed, incr))
     ws.write(row+11, col+2, 'LOC / Hr')
     write_summary_info(ws, row + 12, col, 'Max Scan Rate',
-                       '=MAX({}[FullSpeed])'.format(TABLE))
+                       '=MAX({})'.format(full_speed))
     ws.write(row+12, col+2, 'LOC / Hr')
     write_summary_info(ws, row + 13, col, 'Avg Scans Per Day',
-                       '=COUNT({0}[ScanId])/(MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn]))'.format(TABLE))
+                       '=COUNT({0})/(MAX({1})-MIN({1}))'.format(scan_id, scan_requested))
     write_summary_info(ws, row + 14, col, '   Sun',
-                       '=COUNTIF({0}[Weekday],"=1")/((MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn]))/7)'.format(
-                           TABLE))
+                       '=COUNTIF({0},"=1")/((MAX({1})-MIN({1}))/7)'.format(weekday, scan_requested))
     write_summary_info(ws, row + 15, col, '   Mon',
-                       '=COUNTIF({0}[Weekday],"=2")/((MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn]))/7)'.format(
-                           TABLE))
+                       '=COUNTIF({0},"=2")/((MAX({1})-MIN({1}))/7)'.format(weekday, scan_requested))
     write_summary_info(ws, row + 16, col, '   Tue',
-                       '=COUNTIF({0}[Weekday],"=3")/((MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn]))/7)'.format(
-                           TABLE))
+                       '=COUNTIF({0},"=3")/((MAX({1})-MIN({1}))/7)'.format(weekday, scan_requested))
     write_summary_info(ws, row + 17, col, '   Wed',
-                       '=COUNTIF({0}[Weekday],"=4")/((MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn]))/7)'.format(
-                           TABLE))
+                       '=COUNTIF({0},"=4")/((MAX({1})-MIN({1}))/7)'.format(weekday, scan_requested))
     write_summary_info(ws, row + 18, col, '   Thu',
-                       '=COUNTIF({0}[Weekday],"=5")/((MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn]))/7)'.format(
-                           TABLE))
+                       '=COUNTIF({0},"=5")/((MAX({1})-MIN({1}))/7)'.format(weekday, scan_requested))
     write_summary_info(ws, row + 19, col, '   Fri',
-                       '=COUNTIF({0}[Weekday],"=6")/((MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn]))/7)'.format(
-                           TABLE))
+                       '=COUNTIF({0},"=6")/((MAX({1})-MIN({1}))/7)'.format(weekday, scan_requested))
     write_summary_info(ws, row + 20, col, '   Sat',
-                       '=COUNTIF({0}[Weekday],"=7")/((MAX({0}[ScanRequestedOn])-MIN({0}[ScanRequestedOn]))/7)'.format(
-                           TABLE))
+                       '=COUNTIF({0},"=7")/((MAX({1})-MIN({1}))/7)'.format(weekday, scan_requested))
 
 
 def write_headers(ws, row, col, data: List[str], cell_format={}):
@@ -634,8 +763,9 @@ def cxsi(customer, scan_data_file, excel, force, debug):
     try:
         init(Args(customer, scan_data_file.name, excel.name, force, debug))
         scan_data = load_json(_args.scan_data_file)
-        write_scans_ws(scan_data['value'])
-        write_summary_ws(scan_data['value'])
+        scans_df = convert_scans_df(scan_data['value'])
+        write_scans_ws(scans_df)
+        write_summary_ws(scans_df)
     except Exception as err:
         _log.critical('Unexpected exception:')
         _log.exception(err)